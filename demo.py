@@ -99,8 +99,9 @@ print(f"Converted {stats['converted']} files")'''
         },
         {
             "title": "Conversion with custom settings",
-            "code": '''from main import HEICToJPGConverter
+            "code": '''from main import HEICToJPGConverter, configure_logging
 
+configure_logging(verbose=True)
 converter = HEICToJPGConverter(quality=80, verbose=True)
 stats = converter.convert_folder(
     input_folder="C:\\\\Photos\\\\HEIC",
@@ -4,7 +4,7 @@ Example usage of the HEIC to JPG converter.
 This file demonstrates how to use the HEICToJPGConverter class programmatically.
 """
 
-from main import HEICToJPGConverter
+from main import HEICToJPGConverter, configure_logging
 from pathlib import Path
 
 
@@ -59,6 +59,9 @@ if __name__ == "__main__":
     print("HEIC to JPG Converter - Example Usage")
     print("=" * 40)
     
+    # Show the converter's log messages on the console
+    configure_logging(verbose=True)
+    
     # Uncomment the example you want to run:
     
     # Example 1: Batch conversion
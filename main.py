@@ -1,43 +1,261 @@
 import os
+import stat
 import sys
+import io
 import argparse
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import chain, islice
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 import logging
+import logging.handlers
+import multiprocessing
 
 from pillow_heif import register_heif_opener
-from PIL import Image, ExifTags
+from PIL import Image, ExifTags, features
 import piexif
 
+try:
+    import mozjpeg_lossless_optimization
+except ImportError:
+    mozjpeg_lossless_optimization = None
+
+try:
+    import numpy as np
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
 
 # Register HEIF opener with Pillow
 register_heif_opener()
 
+logger = logging.getLogger(__name__)
+
+# Lowercase suffixes of HEIC files, compared against the last 5 characters of a name
+_HEIC_EXTS = frozenset(('.heic', '.heif'))
+
+# Converter used by each worker process of the batch pool
+_worker_converter = None
+
+
+def configure_logging(verbose: bool = False):
+    """
+    Configure console logging for command line use.
+    
+    Args:
+        verbose: Enable debug-level logging
+    """
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+
+class _ParentLogHandler(logging.Handler):
+    """Route log records received from worker processes through this process's loggers."""
+    
+    def emit(self, record: logging.LogRecord):
+        logging.getLogger(record.name).handle(record)
+
+
+def _init_worker(converter: 'HEICToJPGConverter', log_queue: multiprocessing.Queue, log_level: int):
+    """Initialize a worker process with a copy of the parent's converter."""
+    global _worker_converter
+    
+    # Hand log records at the parent's level to the parent process instead of writing them here
+    root_logger = logging.getLogger()
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    logger.setLevel(log_level)
+    
+    # The pool already uses every core, so libheif gets one decode thread per
+    # process; depth/auxiliary images (and thumbnails unless used) are never written
+    register_heif_opener(
+        decode_threads=1,
+        depth_images=False,
+        aux_images=False,
+        thumbnails=bool(converter.passthrough_min_size or converter.max_dimension)
+    )
+    
+    converter.setup_logging()
+    _worker_converter = converter
+
+
+def _convert_worker(task: Tuple[Path, Path]) -> bool:
+    """Convert a single (source_path, output_path) task in a worker process."""
+    return _worker_converter.convert_task(task)
+
+
+def _insert_segments(jpeg_data: bytes, segments: bytes) -> bytes:
+    """Insert marker segments after the SOI/APP0 markers of a JPEG."""
+    position = 2
+    if jpeg_data[2:4] == b'\xff\xe0':
+        position += 2 + int.from_bytes(jpeg_data[4:6], 'big')
+    return b''.join((jpeg_data[:position], segments, jpeg_data[position:]))
+
+
+def _insert_exif(jpeg_data: bytes, exif_data: bytes) -> bytes:
+    """Insert EXIF data as an APP1 segment after the SOI/APP0 markers of a JPEG."""
+    if not exif_data.startswith(b'Exif\x00\x00'):
+        exif_data = b'Exif\x00\x00' + exif_data
+    if len(exif_data) > 65533:
+        raise ValueError("EXIF data is too long")
+    return _insert_segments(jpeg_data, b'\xff\xe1' + (len(exif_data) + 2).to_bytes(2, 'big') + exif_data)
+
+
+def _insert_icc_profile(jpeg_data: bytes, icc_profile: bytes) -> bytes:
+    """Insert an ICC profile as APP2 segments after the SOI/APP0 markers of a JPEG."""
+    # Each APP2 segment holds at most 65519 profile bytes after its 14-byte header
+    chunk_size = 65519
+    chunks = [icc_profile[i:i + chunk_size] for i in range(0, len(icc_profile), chunk_size)]
+    segments = b''.join(
+        b'\xff\xe2' + (len(chunk) + 16).to_bytes(2, 'big') + b'ICC_PROFILE\x00'
+        + bytes((index, len(chunks))) + chunk
+        for index, chunk in enumerate(chunks, 1)
+    )
+    return _insert_segments(jpeg_data, segments)
+
 
 class HEICToJPGConverter:
     """A class to convert HEIC images to JPG format while preserving metadata."""
     
-    def __init__(self, quality: int = 95, verbose: bool = False):
+    # Maximum number of serialized EXIF blocks kept by dump_exif
+    EXIF_CACHE_SIZE = 256
+    
+    # Image info keys that are saved explicitly rather than passed through
+    _SKIP_INFO_KEYS = frozenset(('exif', 'icc_profile', 'xmp'))
+    
+    # JPEG save arguments shared by every file
+    _BASE_SAVE_KWARGS = {'format': 'JPEG'}
+    
+    def __init__(self, quality: int = 95, verbose: bool = False, optimize: bool = False,
+                 progressive: bool = False, grayscale: bool = False, verify: bool = False,
+                 passthrough_min_size: Optional[int] = None, max_dimension: Optional[int] = None,
+                 workers: int = 1, overwrite: bool = False):
         """
         Initialize the converter.
         
         Args:
             quality: JPG quality (1-100, default: 95)
-            verbose: Enable verbose logging
+            verbose: Kept for compatibility; call configure_logging(verbose=True) for debug logging
+            optimize: Optimize JPG Huffman tables (smaller files, ~2x slower encode)
+            progressive: Write progressive JPGs (slower encode)
+            grayscale: Write single-channel grayscale JPGs
+            verify: Re-read each converted JPG to verify metadata preservation
+            passthrough_min_size: Convert the smallest embedded thumbnail that is a scaled copy
+                of the image with its longest side at least this many pixels instead of the
+                full image (default: off)
+            max_dimension: Downscale images so neither side exceeds this many pixels
+                (default: keep full size)
+            workers: Number of worker processes for folder conversion; 1 converts
+                serially (default: 1)
+            overwrite: Reconvert files whose JPG is already newer than the source
         """
         self.quality = quality
         self.verbose = verbose
+        self.optimize = optimize
+        self.progressive = progressive
+        self.grayscale = grayscale
+        self.verify = verify
+        self.passthrough_min_size = passthrough_min_size
+        self.max_dimension = max_dimension
+        self.workers = workers
+        self.overwrite = overwrite
+        self._exif_cache: OrderedDict[bytes, bytes] = OrderedDict()
         self.setup_logging()
+        self.check_jpeg_backend()
+        self.using_simd = self.check_pillow_simd()
         
     def setup_logging(self):
-        """Setup logging configuration."""
-        level = logging.DEBUG if self.verbose else logging.INFO
-        logging.basicConfig(
-            level=level,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        self.logger = logging.getLogger(__name__)
+        """Use the module logger; its level and handlers are left to the application."""
+        self.logger = logger
+    
+    def check_jpeg_backend(self) -> bool:
+        """
+        Check whether Pillow's JPEG encoder is built against libjpeg-turbo.
+        
+        Returns:
+            True if libjpeg-turbo is available, False otherwise
+        """
+        has_turbo = bool(features.check_feature('libjpeg_turbo'))
+        if has_turbo:
+            self.logger.debug("Pillow JPEG encoder: libjpeg-turbo")
+        else:
+            self.logger.warning("Pillow is not built against libjpeg-turbo; JPEG encoding will be slower. "
+                                "See README for installing a libjpeg-turbo build of Pillow.")
+        
+        if simplejpeg is not None:
+            self.logger.debug("simplejpeg encoder enabled")
+        if mozjpeg_lossless_optimization is not None:
+            self.logger.debug("mozjpeg lossless optimization available for --optimize")
+        
+        return has_turbo
+    
+    def check_pillow_simd(self) -> bool:
+        """
+        Check whether Pillow is the Pillow-SIMD build.
+        
+        Pillow-SIMD tags its releases with a ``.postN`` suffix.
+        
+        Returns:
+            True if Pillow-SIMD is installed, False otherwise
+        """
+        version = features.version('pil') or ''
+        using_simd = 'post' in version
+        if using_simd:
+            self.logger.debug(f"Pillow-SIMD {version} detected")
+        else:
+            self.logger.debug("Install pillow-simd for 2-6x faster resize/convert: "
+                              "pip uninstall pillow && pip install pillow-simd")
+        
+        return using_simd
+    
+    def iter_heic_files(self, folder_path: Path) -> Iterator[Path]:
+        """
+        Yield all HEIC files in the given folder and subfolders as they are found.
+        
+        Args:
+            folder_path: Path to the folder to search
+            
+        Yields:
+            HEIC file paths
+        """
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        
+        # Walk with os.scandir: DirEntry caches its file type, so non-HEIC
+        # entries cost neither a stat() call nor a Path object
+        stack = [str(folder_path)]
+        while stack:
+            directory = stack.pop()
+            heic_entries = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name[-5:].lower() in _HEIC_EXTS and entry.is_file():
+                            heic_entries.append(entry)
+            except Exception as e:
+                self.logger.error(f"Error searching for HEIC files in {directory}: {e}")
+            
+            # Read each folder's files in inode order, which roughly follows their
+            # on-disk layout; DirEntry.inode() needs no stat() call outside Windows
+            if os.name != 'nt':
+                heic_entries.sort(key=lambda entry: entry.inode())
+            
+            for entry in heic_entries:
+                file_path = Path(entry.path)
+                if debug:
+                    self.logger.debug(f"Found HEIC file: {file_path}")
+                yield file_path
     
     def find_heic_files(self, folder_path: Path) -> List[Path]:
         """
@@ -49,18 +267,7 @@ class HEICToJPGConverter:
         Returns:
             List of HEIC file paths
         """
-        heic_extensions = {'.heic', '.heif', '.HEIC', '.HEIF'}
-        heic_files = []
-        
-        try:
-            for file_path in folder_path.rglob('*'):
-                if file_path.is_file() and file_path.suffix in heic_extensions:
-                    heic_files.append(file_path)
-                    self.logger.debug(f"Found HEIC file: {file_path}")
-        except Exception as e:
-            self.logger.error(f"Error searching for HEIC files in {folder_path}: {e}")
-            
-        return heic_files
+        return list(self.iter_heic_files(folder_path))
     
     def preserve_metadata(self, source_image: Image.Image, target_path: Path) -> dict:
         """
@@ -74,57 +281,81 @@ class HEICToJPGConverter:
             Dictionary containing metadata information
         """
         metadata_info = {}
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         
         try:
             # Get comprehensive image info (includes EXIF, XMP, ICC profiles, etc.)
             if hasattr(source_image, 'info') and source_image.info:
-                metadata_info['info'] = source_image.info.copy()
-                self.logger.debug(f"Extracted image info with {len(source_image.info)} items")
-                
-                # Extract EXIF data if present in info
-                if 'exif' in source_image.info:
-                    metadata_info['exif_raw'] = source_image.info['exif']
-                    self.logger.debug(f"Found raw EXIF data: {len(source_image.info['exif'])} bytes")
+                # Only the keys are needed; the blobs are read from source_image.info by key
+                metadata_info['info_keys'] = list(source_image.info.keys())
+                if debug:
+                    self.logger.debug(f"Extracted image info with {len(source_image.info)} items")
                 
-                # Extract XMP data if present
-                if 'xmp' in source_image.info:
-                    metadata_info['xmp'] = source_image.info['xmp']
-                    self.logger.debug(f"Found XMP data: {len(source_image.info['xmp'])} bytes")
-                
-                # Extract ICC profile if present
-                if 'icc_profile' in source_image.info:
-                    metadata_info['icc_profile'] = source_image.info['icc_profile']
-                    self.logger.debug(f"Found ICC profile: {len(source_image.info['icc_profile'])} bytes")
+                # Extract raw EXIF, XMP and ICC profile blobs if present
+                for info_key, metadata_key in (('exif', 'exif_raw'), ('xmp', 'xmp'), ('icc_profile', 'icc_profile')):
+                    value = source_image.info.get(info_key)
+                    if value is not None:
+                        metadata_info[metadata_key] = value
             
-            # Try alternative EXIF extraction method
-            try:
-                exif_dict = source_image.getexif()
-                if exif_dict:
-                    metadata_info['exif_dict'] = dict(exif_dict)
-                    self.logger.debug(f"Extracted EXIF dictionary with {len(exif_dict)} entries")
-            except Exception as e:
-                self.logger.debug(f"Alternative EXIF extraction failed: {e}")
+            # The raw EXIF blob is written as-is, so only parse EXIF into
+            # dictionaries when it is missing
+            if 'exif_raw' not in metadata_info:
+                # Try alternative EXIF extraction method
+                try:
+                    exif_dict = source_image.getexif()
+                    if exif_dict:
+                        metadata_info['exif_dict'] = dict(exif_dict)
+                        self.logger.debug(f"Extracted EXIF dictionary with {len(exif_dict)} entries")
+                except Exception as e:
+                    self.logger.debug(f"Alternative EXIF extraction failed: {e}")
             
             # Try legacy _getexif method
-            try:
-                if hasattr(source_image, '_getexif') and source_image._getexif():
-                    legacy_exif = source_image._getexif()
-                    metadata_info['legacy_exif'] = legacy_exif
-                    self.logger.debug(f"Extracted legacy EXIF data with {len(legacy_exif)} entries")
-            except Exception as e:
-                self.logger.debug(f"Legacy EXIF extraction failed: {e}")
+            if 'exif_raw' not in metadata_info and 'exif_dict' not in metadata_info:
+                try:
+                    legacy_exif = source_image._getexif() if hasattr(source_image, '_getexif') else None
+                    if legacy_exif:
+                        metadata_info['legacy_exif'] = legacy_exif
+                        self.logger.debug(f"Extracted legacy EXIF data with {len(legacy_exif)} entries")
+                except Exception as e:
+                    self.logger.debug(f"Legacy EXIF extraction failed: {e}")
                 
         except Exception as e:
             self.logger.warning(f"Could not extract some metadata: {e}")
             
         return metadata_info
     
-    def verify_metadata_preservation(self, original_path: Path, converted_path: Path) -> dict:
+    def dump_exif(self, exif_ifd: dict) -> bytes:
+        """
+        Serialize an EXIF IFD with piexif, reusing results for identical tags.
+        
+        Photos from one session often share identical EXIF, so recent results
+        are kept in a small LRU cache keyed by a hash of the sorted tags.
+        
+        Args:
+            exif_ifd: Dictionary of EXIF tag IDs to values
+            
+        Returns:
+            EXIF data as bytes
+        """
+        key = hashlib.blake2b(repr(sorted(exif_ifd.items())).encode(), digest_size=16).digest()
+        
+        exif_data = self._exif_cache.get(key)
+        if exif_data is not None:
+            self._exif_cache.move_to_end(key)
+            return exif_data
+        
+        exif_data = piexif.dump({"Exif": exif_ifd})
+        self._exif_cache[key] = exif_data
+        if len(self._exif_cache) > self.EXIF_CACHE_SIZE:
+            self._exif_cache.popitem(last=False)
+        return exif_data
+    
+    def verify_metadata_preservation(self, original_metadata: dict, converted_path: Path) -> dict:
         """
         Verify that metadata was preserved in the converted image.
         
         Args:
-            original_path: Path to original HEIC file
+            original_metadata: Metadata extracted from the original image by preserve_metadata
             converted_path: Path to converted JPG file
             
         Returns:
@@ -139,10 +370,7 @@ class HEICToJPGConverter:
         }
         
         try:
-            # Check original metadata
-            with Image.open(original_path) as original_img:
-                original_metadata = self.preserve_metadata(original_img, converted_path)
-                verification['metadata_count_original'] = len(original_metadata.get('info', {}))
+            verification['metadata_count_original'] = len(original_metadata.get('info_keys', []))
             
             # Check converted metadata
             with Image.open(converted_path) as converted_img:
@@ -181,119 +409,393 @@ class HEICToJPGConverter:
             # Determine output path
             if output_folder:
                 output_folder.mkdir(parents=True, exist_ok=True)
-                output_path = output_folder / f"{source_path.stem}.jpg"
-            else:
-                output_path = source_path.parent / f"{source_path.stem}.jpg"
+            output_path = self.get_output_path(source_path, output_folder)
             
-            # Skip if output already exists
-            if output_path.exists():
-                self.logger.info(f"Skipping {source_path.name} - output already exists")
+            # Skip if output is already up to date
+            if self.is_up_to_date(source_path, output_path):
+                self.logger.info(f"Skipping {source_path.name} - output is up to date")
                 return True
+        except Exception as e:
+            self.logger.error(f"Error converting {source_path}: {e}")
+            return False
+        
+        return self.convert_file(source_path, output_path)
+    
+    def is_up_to_date(self, source_path: Path, output_path: Path) -> bool:
+        """
+        Check whether a JPG exists and is at least as new as its source.
+        
+        Args:
+            source_path: Path to the source HEIC file
+            output_path: Path of the output JPG file
+            
+        Returns:
+            True if the conversion can be skipped, False otherwise
+        """
+        if self.overwrite:
+            return False
+        
+        try:
+            return os.stat(output_path).st_mtime_ns >= os.stat(source_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+    
+    @staticmethod
+    def get_output_path(source_path: Path, output_folder: Optional[Path] = None) -> Path:
+        """
+        Get the JPG path a HEIC file is converted to.
+        
+        Args:
+            source_path: Path to the source HEIC file
+            output_folder: Optional output folder (default: same as source)
             
-            self.logger.info(f"Converting: {source_path.name} -> {output_path.name}")
+        Returns:
+            Path of the output JPG file
+        """
+        return (output_folder or source_path.parent) / f"{source_path.stem}.jpg"
+    
+    def decode_source(self, source_path: Path) -> Image.Image:
+        """
+        Decode a HEIC file into an image ready for JPG encoding.
+        
+        Args:
+            source_path: Path to the source HEIC file
             
-            # Open and convert the image
-            with Image.open(source_path) as img:
-                # Convert to RGB if necessary (HEIC can be in different color modes)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Preserve metadata
-                metadata = self.preserve_metadata(img, output_path)
-                
-                # Prepare save arguments with comprehensive metadata preservation
-                save_kwargs = {
-                    'format': 'JPEG',
-                    'quality': self.quality,
-                    'optimize': True
-                }
-                
-                # Add EXIF data - try multiple sources
-                exif_data = None
-                
-                # First try: raw EXIF from image info
-                if 'exif_raw' in metadata:
-                    try:
-                        exif_data = metadata['exif_raw']
-                        self.logger.debug("Using raw EXIF data from image info")
-                    except Exception as e:
-                        self.logger.debug(f"Failed to use raw EXIF: {e}")
-                
-                # Second try: convert EXIF dictionary using piexif
-                if not exif_data and 'exif_dict' in metadata:
-                    try:
-                        # Convert PIL EXIF dict to piexif format
-                        exif_ifd = {}
-                        for tag_id, value in metadata['exif_dict'].items():
-                            try:
-                                # Only include valid EXIF tags
-                                if isinstance(tag_id, int) and tag_id in range(0, 65536):
-                                    exif_ifd[tag_id] = value
-                            except Exception:
-                                continue
-                        
-                        if exif_ifd:
-                            exif_data = piexif.dump({"Exif": exif_ifd})
-                            self.logger.debug(f"Converted EXIF dictionary to bytes: {len(exif_ifd)} tags")
-                    except Exception as e:
-                        self.logger.debug(f"Failed to convert EXIF dictionary: {e}")
-                
-                # Third try: legacy EXIF
-                if not exif_data and 'legacy_exif' in metadata:
-                    try:
-                        exif_data = piexif.dump({"Exif": metadata['legacy_exif']})
-                        self.logger.debug("Using legacy EXIF data")
-                    except Exception as e:
-                        self.logger.debug(f"Failed to use legacy EXIF: {e}")
-                
-                # Add EXIF to save parameters
-                if exif_data:
-                    save_kwargs['exif'] = exif_data
-                    self.logger.debug("EXIF data will be preserved in JPG")
-                else:
-                    self.logger.warning("No EXIF data could be preserved")
-                
-                # Add ICC profile if available
-                if 'icc_profile' in metadata:
-                    try:
-                        save_kwargs['icc_profile'] = metadata['icc_profile']
-                        self.logger.debug("ICC color profile will be preserved")
-                    except Exception as e:
-                        self.logger.debug(f"Failed to preserve ICC profile: {e}")
-                
-                # Add other metadata if supported
-                if 'info' in metadata:
-                    # Preserve any other metadata that PIL can handle
-                    for key, value in metadata['info'].items():
-                        if key not in ['exif', 'icc_profile', 'xmp'] and isinstance(value, (str, bytes, int, float)):
-                            try:
-                                save_kwargs[key] = value
-                            except Exception:
-                                pass  # Some metadata might not be compatible with JPEG
-                
-                # Save the image with all preserved metadata
+        Returns:
+            Decoded PIL Image in the output color mode, downscaled if requested
+        """
+        img = Image.open(source_path)
+        
+        # pillow-heif's draft() swaps in the smallest embedded thumbnail that is at least
+        # the requested size and a true scaled copy of the image (same aspect ratio, crop,
+        # rotation and color profile); otherwise the full image is decoded
+        if self.passthrough_min_size and max(img.size) > self.passthrough_min_size:
+            scale = self.passthrough_min_size / max(img.size)
+            img.draft(None, (int(img.width * scale), int(img.height * scale)))
+        
+        # Downscale if requested; thumbnail() also lets draft() pick an embedded
+        # thumbnail at least twice the target size, so the full image is not decoded
+        if self.max_dimension and max(img.size) > self.max_dimension:
+            img.thumbnail((self.max_dimension, self.max_dimension), Image.Resampling.LANCZOS)
+        img.load()
+        
+        # Convert to RGB (or grayscale) if necessary (HEIC can be in different color modes)
+        target_mode = 'L' if self.grayscale else 'RGB'
+        if img.mode != target_mode:
+            with img:
+                img = img.convert(target_mode)
+        
+        return img
+    
+    def encode_image(self, img: Image.Image, output_path: Path):
+        """
+        Encode a decoded image to the given JPG path with its metadata, then close it.
+        
+        Args:
+            img: Image returned by decode_source
+            output_path: Path of the JPG file to write
+        """
+        with img:
+            # Preserve metadata
+            metadata = self.preserve_metadata(img, output_path)
+            
+            # Prepare save arguments with comprehensive metadata preservation
+            save_kwargs = dict(self._BASE_SAVE_KWARGS)
+            save_kwargs['quality'] = self.quality
+            if self.optimize:
+                save_kwargs['optimize'] = True
+            if self.progressive:
+                save_kwargs['progressive'] = True
+            
+            # Add EXIF data - try multiple sources
+            exif_data = None
+            
+            # First try: raw EXIF from image info
+            if 'exif_raw' in metadata:
+                try:
+                    exif_data = metadata['exif_raw']
+                    self.logger.debug("Using raw EXIF data from image info")
+                except Exception as e:
+                    self.logger.debug(f"Failed to use raw EXIF: {e}")
+            
+            # Second try: convert EXIF dictionary using piexif
+            if not exif_data and 'exif_dict' in metadata:
+                try:
+                    # Convert PIL EXIF dict to piexif format, keeping only valid EXIF tags
+                    exif_ifd = {tag_id: value for tag_id, value in metadata['exif_dict'].items()
+                                if type(tag_id) is int and 0 <= tag_id < 65536}
+                    
+                    if exif_ifd:
+                        exif_data = self.dump_exif(exif_ifd)
+                        self.logger.debug(f"Converted EXIF dictionary to bytes: {len(exif_ifd)} tags")
+                except Exception as e:
+                    self.logger.debug(f"Failed to convert EXIF dictionary: {e}")
+            
+            # Third try: legacy EXIF
+            if not exif_data and 'legacy_exif' in metadata:
+                try:
+                    exif_data = piexif.dump({"Exif": metadata['legacy_exif']})
+                    self.logger.debug("Using legacy EXIF data")
+                except Exception as e:
+                    self.logger.debug(f"Failed to use legacy EXIF: {e}")
+            
+            # Add EXIF to save parameters
+            if exif_data:
+                save_kwargs['exif'] = exif_data
+                self.logger.debug("EXIF data will be preserved in JPG")
+            else:
+                self.logger.warning("No EXIF data could be preserved")
+            
+            # Add ICC profile if available (an RGB profile does not apply to grayscale)
+            if 'icc_profile' in metadata and not self.grayscale:
+                try:
+                    save_kwargs['icc_profile'] = metadata['icc_profile']
+                    self.logger.debug("ICC color profile will be preserved")
+                except Exception as e:
+                    self.logger.debug(f"Failed to preserve ICC profile: {e}")
+            
+            # Add other metadata if supported
+            if 'info_keys' in metadata:
+                # Preserve any other metadata that PIL can handle
+                for key, value in img.info.items():
+                    if key not in self._SKIP_INFO_KEYS and isinstance(value, (str, bytes, int, float)):
+                        try:
+                            save_kwargs[key] = value
+                        except Exception:
+                            pass  # Some metadata might not be compatible with JPEG
+            
+            # Save the image with all preserved metadata
+            if self.optimize and mozjpeg_lossless_optimization is not None:
+                # mozjpeg's lossless optimization replaces Pillow's slower optimize pass
+                save_kwargs.pop('optimize', None)
+                buffer = io.BytesIO()
+                img.save(buffer, **save_kwargs)
+                output_path.write_bytes(mozjpeg_lossless_optimization.optimize(
+                    buffer.getvalue(), copy=mozjpeg_lossless_optimization.COPY_MARKERS.ALL))
+            elif simplejpeg is not None and img.mode == 'RGB' and not (self.optimize or self.progressive):
+                output_path.write_bytes(self.encode_simplejpeg(img, save_kwargs))
+            else:
                 img.save(output_path, **save_kwargs)
-                
-            # Verify metadata preservation if verbose mode is enabled
-            if self.verbose:
-                verification = self.verify_metadata_preservation(source_path, output_path)
-                if verification['exif_preserved']:
-                    self.logger.info(f"✓ EXIF preserved: {len(verification['preserved_tags'])} tags")
-                else:
-                    self.logger.warning("✗ No EXIF data preserved")
-                
-                if verification['icc_profile_preserved']:
-                    self.logger.info("✓ ICC color profile preserved")
-                else:
-                    self.logger.debug("No ICC profile to preserve")
-                
-            self.logger.info(f"Successfully converted: {output_path}")
+        
+        # Verify metadata preservation if requested
+        if self.verify:
+            verification = self.verify_metadata_preservation(metadata, output_path)
+            if verification['exif_preserved']:
+                self.logger.info(f"✓ EXIF preserved: {len(verification['preserved_tags'])} tags")
+            else:
+                self.logger.warning("✗ No EXIF data preserved")
+            
+            if verification['icc_profile_preserved']:
+                self.logger.info("✓ ICC color profile preserved")
+            else:
+                self.logger.debug("No ICC profile to preserve")
+    
+    def convert_file(self, source_path: Path, output_path: Path,
+                     source_image: Optional[Image.Image] = None) -> bool:
+        """
+        Convert a HEIC file to the given JPG path, overwriting it if present.
+        
+        The output folder must already exist.
+        
+        Args:
+            source_path: Path to the source HEIC file
+            output_path: Path of the JPG file to write
+            source_image: Optional image already decoded by decode_source
+            
+        Returns:
+            True if conversion successful, False otherwise
+        """
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        
+        try:
+            if debug:
+                self.logger.debug(f"Converting: {source_path.name} -> {output_path.name}")
+            
+            if source_image is None:
+                source_image = self.decode_source(source_path)
+            self.encode_image(source_image, output_path)
+            
+            if debug:
+                self.logger.debug(f"Successfully converted: {output_path}")
             return True
             
         except Exception as e:
             self.logger.error(f"Error converting {source_path}: {e}")
             return False
     
+    def encode_simplejpeg(self, img: Image.Image, save_kwargs: dict) -> bytes:
+        """
+        Encode an RGB image with simplejpeg, embedding its EXIF and ICC profile.
+        
+        Args:
+            img: RGB PIL Image to encode
+            save_kwargs: JPEG save arguments prepared for Image.save
+            
+        Returns:
+            Encoded JPEG bytes
+        """
+        # 4:2:0 subsampling matches Pillow's default JPEG output
+        jpeg_data = simplejpeg.encode_jpeg(np.asarray(img), quality=save_kwargs['quality'],
+                                           colorspace='RGB', colorsubsampling='420', fastdct=True)
+        
+        # Splice the segments in directly (APP1 EXIF ahead of APP2 ICC, as Pillow writes
+        # them) rather than round-tripping through piexif.insert and a BytesIO
+        icc_profile = save_kwargs.get('icc_profile')
+        if icc_profile:
+            jpeg_data = _insert_icc_profile(jpeg_data, icc_profile)
+        
+        exif_data = save_kwargs.get('exif')
+        if exif_data:
+            jpeg_data = _insert_exif(jpeg_data, exif_data)
+        
+        return jpeg_data
+    
+    def convert_task(self, task: Tuple[Path, Path], source_image: Optional[Image.Image] = None) -> bool:
+        """
+        Convert one (source_path, output_path) task, never raising.
+        
+        Args:
+            task: Tuple of the source HEIC path and its output JPG path
+            source_image: Optional image already decoded by decode_source
+            
+        Returns:
+            True if conversion successful, False otherwise
+        """
+        heic_file, jpg_file = task
+        try:
+            return self.convert_file(heic_file, jpg_file, source_image)
+        except Exception as e:
+            self.logger.error(f"Unexpected error processing {heic_file}: {e}")
+            return False
+    
+    def _iter_tasks(self, input_path: Path, output_path: Optional[Path],
+                    stats: dict) -> Iterator[Tuple[Path, Path]]:
+        """
+        Yield (source_path, output_path) tasks for HEIC files under input_path.
+        
+        Files whose JPG is already up to date are counted as skipped instead of
+        being yielded, and each output folder is created once.
+        
+        Args:
+            input_path: Folder to scan for HEIC files
+            output_path: Optional output folder root
+            stats: Statistics dictionary to update with total and skipped counts
+        """
+        created_folders = set()
+        
+        for heic_file in self.iter_heic_files(input_path):
+            stats['total'] += 1
+            
+            # Maintain folder structure if output folder is specified
+            if output_path:
+                relative_path = heic_file.relative_to(input_path)
+                file_output_folder = output_path / relative_path.parent
+            else:
+                file_output_folder = None
+            jpg_file = self.get_output_path(heic_file, file_output_folder)
+            
+            if self.is_up_to_date(heic_file, jpg_file):
+                stats['skipped'] += 1
+                continue
+            
+            if file_output_folder and file_output_folder not in created_folders:
+                try:
+                    file_output_folder.mkdir(parents=True, exist_ok=True)
+                except OSError as e:
+                    self.logger.error(f"Error creating output folder {file_output_folder}: {e}")
+                    stats['failed'] += 1
+                    continue
+                created_folders.add(file_output_folder)
+            
+            yield heic_file, jpg_file
+    
+    def _convert_serial(self, tasks: Iterator[Tuple[Path, Path]], stats: dict, progress=None):
+        """
+        Convert tasks one at a time, decoding the next source file in the background.
+        
+        libheif and libjpeg release the GIL, so decoding the next file overlaps
+        with encoding the current one.
+        
+        Args:
+            tasks: Iterator of (source_path, output_path) tasks
+            stats: Statistics dictionary to update
+            progress: Optional tqdm progress bar to advance per file
+        """
+        converted = failed = 0
+        
+        with ThreadPoolExecutor(max_workers=1) as decoder:
+            task = next(tasks, None)
+            decoding = decoder.submit(self.decode_source, task[0]) if task else None
+            
+            while task is not None:
+                next_task = next(tasks, None)
+                next_decoding = decoder.submit(self.decode_source, next_task[0]) if next_task else None
+                
+                try:
+                    source_image = decoding.result()
+                except Exception as e:
+                    self.logger.error(f"Error converting {task[0]}: {e}")
+                    success = False
+                else:
+                    success = self.convert_task(task, source_image)
+                
+                if success:
+                    converted += 1
+                else:
+                    failed += 1
+                if progress is not None:
+                    progress.update()
+                task, decoding = next_task, next_decoding
+        
+        stats['converted'] += converted
+        stats['failed'] += failed
+    
+    def _convert_parallel(self, tasks: Iterator[Tuple[Path, Path]], stats: dict, progress=None):
+        """
+        Convert tasks in a process pool, keeping a bounded number in flight.
+        
+        Args:
+            tasks: Iterator of (source_path, output_path) tasks
+            stats: Statistics dictionary to update
+            progress: Optional tqdm progress bar to advance per file
+        """
+        max_workers = self.workers
+        max_pending = 2 * max_workers
+        pending = set()
+        converted = failed = 0
+        
+        # Spawn workers: forking while the log listener and reader threads run can deadlock
+        mp_context = multiprocessing.get_context('spawn')
+        
+        # Worker log records are passed to this process's loggers by a single listener
+        # thread, so they are handled exactly like records from a serial run
+        log_queue = mp_context.Queue()
+        listener = logging.handlers.QueueListener(log_queue, _ParentLogHandler())
+        listener.start()
+        
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     mp_context=mp_context,
+                                     initializer=_init_worker,
+                                     initargs=(self, log_queue, logger.getEffectiveLevel())) as executor:
+                while True:
+                    for task in islice(tasks, max_pending - len(pending)):
+                        pending.add(executor.submit(_convert_worker, task))
+                    if not pending:
+                        break
+                    
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    succeeded = sum(future.result() for future in done)
+                    converted += succeeded
+                    failed += len(done) - succeeded
+                    if progress is not None:
+                        progress.update(len(done))
+        finally:
+            listener.stop()
+        
+        stats['converted'] += converted
+        stats['failed'] += failed
+    
     def convert_folder(self, input_folder: str, output_folder: Optional[str] = None) -> dict:
         """
         Convert all HEIC files in a folder to JPG format.
@@ -308,51 +810,48 @@ class HEICToJPGConverter:
         input_path = Path(input_folder)
         output_path = Path(output_folder) if output_folder else None
         
-        if not input_path.exists():
-            raise ValueError(f"Input folder does not exist: {input_folder}")
+        # One stat() call covers both checks
+        try:
+            input_mode = os.stat(input_path).st_mode
+        except (FileNotFoundError, NotADirectoryError):
+            raise ValueError(f"Input folder does not exist: {input_folder}") from None
         
-        if not input_path.is_dir():
+        if not stat.S_ISDIR(input_mode):
             raise ValueError(f"Input path is not a directory: {input_folder}")
         
-        # Find all HEIC files
-        heic_files = self.find_heic_files(input_path)
+        # Stream conversion tasks from the scan so conversion starts right away
+        stats = {'total': 0, 'converted': 0, 'failed': 0, 'skipped': 0}
+        tasks = self._iter_tasks(input_path, output_path, stats)
+        first_tasks = list(islice(tasks, 2))
         
-        if not heic_files:
-            self.logger.warning(f"No HEIC files found in {input_folder}")
-            return {'total': 0, 'converted': 0, 'failed': 0, 'skipped': 0}
+        # Show a rate-limited progress bar instead of per-file log lines (terminals only)
+        progress = tqdm(unit='file', desc='Converting', disable=None) if tqdm is not None else None
         
-        self.logger.info(f"Found {len(heic_files)} HEIC files to convert")
+        # Convert each file, in parallel when there is more than one
+        try:
+            if self.workers == 1 or len(first_tasks) < 2:
+                self._convert_serial(chain(first_tasks, tasks), stats, progress)
+            else:
+                self._convert_parallel(chain(first_tasks, tasks), stats, progress)
+        finally:
+            if progress is not None:
+                progress.close()
         
-        # Convert each file
-        stats = {'total': len(heic_files), 'converted': 0, 'failed': 0, 'skipped': 0}
+        if stats['total'] == 0:
+            self.logger.warning(f"No HEIC files found in {input_folder}")
+            return stats
         
-        for heic_file in heic_files:
-            try:
-                # Maintain folder structure if output folder is specified
-                if output_path:
-                    relative_path = heic_file.relative_to(input_path)
-                    file_output_folder = output_path / relative_path.parent
-                else:
-                    file_output_folder = None
-                
-                success = self.convert_single_file(heic_file, file_output_folder)
-                
-                if success:
-                    stats['converted'] += 1
-                else:
-                    stats['failed'] += 1
-                    
-            except Exception as e:
-                self.logger.error(f"Unexpected error processing {heic_file}: {e}")
-                stats['failed'] += 1
+        if stats['skipped']:
+            self.logger.info(f"Skipping {stats['skipped']} already-converted files")
         
         # Print summary
         self.logger.info(f"""
 Conversion Summary:
   Total files: {stats['total']}
   Converted: {stats['converted']}
+  Skipped: {stats['skipped']}
   Failed: {stats['failed']}
-  Success rate: {(stats['converted'] / stats['total'] * 100):.1f}%
+  Success rate: {((stats['converted'] + stats['skipped']) / stats['total'] * 100):.1f}%
         """)
         
         return stats
@@ -377,6 +876,48 @@ def main():
         default=95,
         help='JPG quality (1-100, default: 95)'
     )
+    parser.add_argument(
+        '-m', '--max-dimension',
+        type=int,
+        help='Downscale images so neither side exceeds this many pixels (default: full size)'
+    )
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='Optimize JPG Huffman tables for slightly smaller files (slower)'
+    )
+    parser.add_argument(
+        '--progressive',
+        action='store_true',
+        help='Write progressive JPGs (slower)'
+    )
+    parser.add_argument(
+        '--grayscale',
+        action='store_true',
+        help='Write grayscale JPGs'
+    )
+    parser.add_argument(
+        '--overwrite',
+        action='store_true',
+        help='Reconvert files even if the JPG is newer than the HEIC'
+    )
+    parser.add_argument(
+        '--verify',
+        action='store_true',
+        help='Re-read each converted JPG to verify metadata preservation'
+    )
+    parser.add_argument(
+        '--fast-passthrough',
+        type=int,
+        metavar='MIN_SIZE',
+        help='Convert the embedded thumbnail instead of the full image when its longest side '
+             'is at least MIN_SIZE pixels'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        help='Number of worker processes; 1 converts serially (default: number of CPUs)'
+    )
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -384,14 +925,32 @@ def main():
     )
     
     args = parser.parse_args()
+    configure_logging(args.verbose)
     
     # Validate quality
     if not 1 <= args.quality <= 100:
         print("Error: Quality must be between 1 and 100")
         sys.exit(1)
     
+    if args.max_dimension is not None and args.max_dimension < 1:
+        print("Error: Max dimension must be a positive number of pixels")
+        sys.exit(1)
+    
+    if args.fast_passthrough is not None and args.fast_passthrough < 1:
+        print("Error: Fast passthrough size must be a positive number of pixels")
+        sys.exit(1)
+    
+    if args.workers is not None and args.workers < 1:
+        print("Error: Workers must be at least 1")
+        sys.exit(1)
+    
     # Create converter
-    converter = HEICToJPGConverter(quality=args.quality, verbose=args.verbose)
+    converter = HEICToJPGConverter(quality=args.quality, verbose=args.verbose, optimize=args.optimize,
+                                   progressive=args.progressive, grayscale=args.grayscale, verify=args.verify,
+                                   passthrough_min_size=args.fast_passthrough,
+                                   max_dimension=args.max_dimension,
+                                   workers=args.workers or os.cpu_count() or 1,
+                                   overwrite=args.overwrite)
     
     try:
         # Convert files
@@ -1,166 +1,433 @@
-#!/usr/bin/env python3
 """
-Test script to verify HEIC to JPG converter functionality.
-This script tests the converter without requiring actual HEIC files.
+Tests for the HEIC to JPG converter.
+Run with pytest: python -m pytest test_converter.py
 """
 
+import io
+import logging
 import tempfile
+import time
 import os
+import sys
+import types
 from pathlib import Path
+import pytest
+from PIL import Image
+import main as converter_module
 from main import HEICToJPGConverter
 
 
+@pytest.fixture(scope='module')
+def converter():
+    """Default converter shared by the tests that do not change its settings."""
+    return HEICToJPGConverter()
+
+
+def create_heic_file(path: Path, size=(64, 48)):
+    """Write a small solid-color HEIC image to the given path."""
+    Image.new('RGB', size, (200, 120, 40)).save(path, format='HEIF')
+
+
 def test_converter_initialization():
     """Test that the converter initializes correctly."""
-    print("Testing converter initialization...")
-    
     # Test default initialization
     converter = HEICToJPGConverter()
     assert converter.quality == 95
     assert converter.verbose is False
+    assert converter.optimize is False
+    assert converter.progressive is False
+    assert converter.workers == 1
     
     # Test custom initialization
-    converter = HEICToJPGConverter(quality=85, verbose=True)
+    converter = HEICToJPGConverter(quality=85, verbose=True, optimize=True, progressive=True)
     assert converter.quality == 85
     assert converter.verbose is True
-    
-    print("✓ Converter initialization test passed")
+    assert converter.optimize is True
+    assert converter.progressive is True
 
 
-def test_find_heic_files():
+def test_find_heic_files(converter, fs):
     """Test the HEIC file discovery functionality."""
-    print("Testing HEIC file discovery...")
+    # Create the directory structure in pyfakefs' in-memory filesystem
+    temp_path = Path("/photos")
     
-    converter = HEICToJPGConverter()
+    # Create test files
+    fs.create_file(temp_path / "test1.heic")
+    fs.create_file(temp_path / "test2.HEIC")
+    fs.create_file(temp_path / "test3.heif")
+    fs.create_file(temp_path / "test4.HEIF")
+    fs.create_file(temp_path / "not_heic.jpg")
+    fs.create_file(temp_path / "not_heic.heic.jpg")
+    fs.create_dir(temp_path / "folder.heic")
     
-    # Create a temporary directory structure
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        
-        # Create test files
-        (temp_path / "test1.heic").touch()
-        (temp_path / "test2.HEIC").touch()
-        (temp_path / "test3.heif").touch()
-        (temp_path / "test4.HEIF").touch()
-        (temp_path / "not_heic.jpg").touch()
-        
-        # Create subdirectory with HEIC files
-        sub_dir = temp_path / "subfolder"
-        sub_dir.mkdir()
-        (sub_dir / "test5.heic").touch()
-        
-        # Test file discovery
-        heic_files = converter.find_heic_files(temp_path)
-        
-        # Should find 5 HEIC files (4 in root, 1 in subfolder)
-        assert len(heic_files) == 5
-        
-        # Check that all found files have correct extensions
-        extensions = {f.suffix.lower() for f in heic_files}
-        assert extensions == {'.heic', '.heif'}
+    # Create subdirectory with HEIC files
+    sub_dir = temp_path / "subfolder"
+    fs.create_file(sub_dir / "test5.heic")
+    fs.create_file(sub_dir / "test6.Heic")
+    
+    # Test file discovery
+    heic_files = converter.find_heic_files(temp_path)
+    
+    # Should find 6 HEIC files (4 in root, 2 in subfolder), each once
+    assert len(heic_files) == 6
+    assert len(set(heic_files)) == 6
+    assert all(f.is_file() for f in heic_files)
     
-    print("✓ HEIC file discovery test passed")
+    # Check that all found files have correct extensions
+    extensions = {f.suffix.lower() for f in heic_files}
+    assert extensions == {'.heic', '.heif'}
+    assert extensions == converter_module._HEIC_EXTS
 
 
-def test_invalid_folder():
-    """Test behavior with invalid folder paths."""
-    print("Testing invalid folder handling...")
+@pytest.mark.skipif(os.name == 'nt', reason="files are not sorted by inode on Windows")
+def test_find_heic_files_inode_order(converter, fs, monkeypatch):
+    """Test that each folder's HEIC files are returned in inode order."""
+    from pyfakefs.fake_scandir import DirEntry
     
-    converter = HEICToJPGConverter()
+    # Name and creation order are a, b, c; inode order is c, a, b
+    root = Path("/photos")
+    inodes = {"a.heic": 2, "b.heic": 3, "c.heic": 1}
+    for name in inodes:
+        fs.create_file(root / name)
+    monkeypatch.setattr(DirEntry, 'inode', lambda entry: inodes[entry.name])
+    
+    heic_files = converter.find_heic_files(root)
     
+    assert [f.name for f in heic_files] == ["c.heic", "a.heic", "b.heic"]
+
+
+def test_find_heic_files_bench(converter, fs, benchmark):
+    """Benchmark scanning a folder of 10,000 HEIC files."""
+    root = Path("/r")
+    for i in range(10000):
+        fs.create_file(root / f"{i}.heic")
+    
+    result = benchmark(converter.find_heic_files, root)
+    
+    assert len(result) == 10000
+
+
+def test_invalid_folder(converter):
+    """Test behavior with invalid folder paths."""
     # Test non-existent folder
-    try:
+    with pytest.raises(ValueError, match="does not exist"):
         converter.convert_folder("/non/existent/path")
-        assert False, "Should have raised ValueError"
-    except ValueError as e:
-        assert "does not exist" in str(e)
     
     # Test file instead of folder
     with tempfile.NamedTemporaryFile() as temp_file:
-        try:
+        with pytest.raises(ValueError, match="not a directory"):
             converter.convert_folder(temp_file.name)
-            assert False, "Should have raised ValueError"
-        except ValueError as e:
-            assert "not a directory" in str(e)
-    
-    print("✓ Invalid folder handling test passed")
 
 
-def test_empty_folder():
+def test_empty_folder(converter, fs):
     """Test behavior with folder containing no HEIC files."""
-    print("Testing empty folder handling...")
+    # Create some non-HEIC files
+    temp_path = Path("/photos")
+    fs.create_file(temp_path / "test.jpg")
+    fs.create_file(temp_path / "test.png")
     
-    converter = HEICToJPGConverter()
+    stats = converter.convert_folder(str(temp_path))
     
+    assert stats['total'] == 0
+    assert stats['converted'] == 0
+    assert stats['failed'] == 0
+    assert stats['skipped'] == 0
+
+
+def test_skip_unchanged():
+    """Test that files are only reconverted when the HEIC is newer than the JPG."""
     with tempfile.TemporaryDirectory() as temp_dir:
-        # Create some non-HEIC files
-        temp_path = Path(temp_dir)
-        (temp_path / "test.jpg").touch()
-        (temp_path / "test.png").touch()
+        source_path = Path(temp_dir) / "foo.heic"
+        output_path = Path(temp_dir) / "foo.jpg"
+        create_heic_file(source_path)
+        output_path.write_bytes(b"")
+        os.utime(source_path, ns=(1_000_000_000, 1_000_000_000))
         
+        converter = HEICToJPGConverter(workers=1)
         stats = converter.convert_folder(temp_dir)
+        assert stats == {'total': 1, 'converted': 0, 'failed': 0, 'skipped': 1}
+        assert output_path.stat().st_size == 0
+        
+        # A source edited after the JPG was written is converted again
+        os.utime(source_path)
+        os.utime(output_path, ns=(1_000_000_000, 1_000_000_000))
+        stats = converter.convert_folder(temp_dir)
+        assert stats == {'total': 1, 'converted': 1, 'failed': 0, 'skipped': 0}
+        assert output_path.stat().st_size > 0
+        
+        # overwrite=True reconverts up-to-date files too
+        stats = HEICToJPGConverter(workers=1, overwrite=True).convert_folder(temp_dir)
+        assert stats == {'total': 1, 'converted': 1, 'failed': 0, 'skipped': 0}
+
+
+def test_parallel_convert():
+    """Test that parallel and serial folder conversion give the same results."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        input_path = temp_path / "input"
+        (input_path / "subfolder").mkdir(parents=True)
+        
+        for i in range(8):
+            folder = input_path / "subfolder" if i % 2 else input_path
+            create_heic_file(folder / f"photo{i}.heic")
+        
+        for workers in (1, 4):
+            output_path = temp_path / f"output_{workers}"
+            converter = HEICToJPGConverter(workers=workers)
+            stats = converter.convert_folder(str(input_path), str(output_path))
+            
+            assert stats == {'total': 8, 'converted': 8, 'failed': 0, 'skipped': 0}
+            assert len(list(output_path.rglob("*.jpg"))) == 8
+            assert len(list((output_path / "subfolder").glob("*.jpg"))) == 4
+
+
+def test_parallel_errors_logged():
+    """Test that worker process errors reach the parent's loggers like serial ones."""
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    converter_module.logger.addHandler(handler)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            create_heic_file(temp_path / "good.heic")
+            (temp_path / "bad.heic").write_bytes(b"not a heic file")
+            
+            for workers in (1, 2):
+                records.clear()
+                for jpg_file in temp_path.glob("*.jpg"):
+                    jpg_file.unlink()
+                
+                stats = HEICToJPGConverter(workers=workers).convert_folder(temp_dir)
+                
+                assert stats == {'total': 2, 'converted': 1, 'failed': 1, 'skipped': 0}
+                assert any(record.getMessage().startswith(f"Error converting {temp_path / 'bad.heic'}")
+                           for record in records)
+    finally:
+        converter_module.logger.removeHandler(handler)
+
+
+def test_pipeline_overlap():
+    """Test that serial conversion decodes the next file while encoding the current one."""
+    def decode_source(source_path):
+        time.sleep(0.1)
+        return Image.new('RGB', (8, 8))
+    
+    def encode_image(img, output_path):
+        time.sleep(0.1)
+        output_path.write_bytes(b"")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(10):
+            (Path(temp_dir) / f"test{i}.heic").write_bytes(b"")
+        
+        converter = HEICToJPGConverter(workers=1)
+        converter.decode_source = decode_source
+        converter.encode_image = encode_image
         
-        assert stats['total'] == 0
-        assert stats['converted'] == 0
-        assert stats['failed'] == 0
+        start = time.perf_counter()
+        stats = converter.convert_folder(temp_dir)
+        elapsed = time.perf_counter() - start
     
-    print("✓ Empty folder handling test passed")
+    assert stats == {'total': 10, 'converted': 10, 'failed': 0, 'skipped': 0}
+    assert elapsed < 1.5  # 2.0s without overlap
 
 
-def test_imports():
-    """Test that all required modules can be imported."""
-    print("Testing module imports...")
+def test_encoder_backend_selection(monkeypatch):
+    """Test that the simplejpeg encoder is used when available."""
+    numpy = pytest.importorskip('numpy')
     
-    try:
-        import pillow_heif
-        print("✓ pillow-heif imported successfully")
-    except ImportError:
-        print("✗ Failed to import pillow-heif")
-        return False
+    calls = []
     
-    try:
-        from PIL import Image, ExifTags
-        print("✓ PIL imported successfully")
-    except ImportError:
-        print("✗ Failed to import PIL")
-        return False
+    def encode_jpeg(image, quality=85, **kwargs):
+        calls.append(quality)
+        buffer = io.BytesIO()
+        Image.fromarray(image).save(buffer, format='JPEG', quality=quality)
+        return buffer.getvalue()
     
-    try:
-        import piexif
-        print("✓ piexif imported successfully")
-    except ImportError:
-        print("✗ Failed to import piexif")
-        return False
+    monkeypatch.setattr(converter_module, 'simplejpeg', types.SimpleNamespace(encode_jpeg=encode_jpeg))
+    monkeypatch.setattr(converter_module, 'mozjpeg_lossless_optimization', None)
+    monkeypatch.setattr(converter_module, 'np', numpy, raising=False)
     
-    print("✓ All module imports test passed")
-    return True
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = Path(temp_dir) / "photo.heic"
+        exif = Image.Exif()
+        exif[0x010f] = 'Apple'
+        Image.new('RGB', (64, 48)).save(source_path, format='HEIF', exif=exif.tobytes())
+        
+        converter = HEICToJPGConverter(quality=80)
+        assert converter.convert_single_file(source_path)
+        assert calls == [80]
+        
+        with Image.open(source_path.with_suffix('.jpg')) as converted:
+            assert converted.getexif()[0x010f] == 'Apple'
+        
+        # Huffman optimization is only available through Pillow
+        source_path.with_suffix('.jpg').unlink()
+        converter = HEICToJPGConverter(quality=80, optimize=True)
+        assert converter.convert_single_file(source_path)
+        assert calls == [80]
 
 
-def main():
-    """Run all tests."""
-    print("HEIC to JPG Converter - Test Suite")
-    print("=" * 40)
+def test_dump_exif_cache(monkeypatch):
+    """Test that dump_exif reuses, refreshes and evicts cached EXIF blocks."""
+    dumps = []
+    original_dump = converter_module.piexif.dump
     
-    try:
-        test_imports()
-        test_converter_initialization()
-        test_find_heic_files()
-        test_invalid_folder()
-        test_empty_folder()
+    def counting_dump(exif_dict):
+        dumps.append(exif_dict)
+        return original_dump(exif_dict)
+    
+    monkeypatch.setattr(converter_module.piexif, 'dump', counting_dump)
+    
+    converter = HEICToJPGConverter()
+    converter.EXIF_CACHE_SIZE = 2
+    ifd_a, ifd_b, ifd_c = ({0x9003: f"2024:01:0{day} 12:00:00".encode()} for day in (1, 2, 3))
+    
+    exif_a = converter.dump_exif(ifd_a)
+    exif_b = converter.dump_exif(ifd_b)
+    assert converter.dump_exif(dict(ifd_a)) is exif_a  # served from the cache, refreshing a
+    assert len(dumps) == 2
+    
+    exif_c = converter.dump_exif(ifd_c)  # evicts b, the least recently used
+    assert len(dumps) == 3
+    assert list(converter._exif_cache.values()) == [exif_a, exif_c]
+    
+    assert converter.dump_exif(ifd_b) == exif_b
+    assert len(dumps) == 4
+    assert list(converter._exif_cache.values()) == [exif_c, exif_b]
+
+
+def test_exif_preserved():
+    """Test that EXIF and ICC segments spliced into an encoded JPEG can be read back."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48)).save(buffer, format='JPEG')
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010f] = 'Apple'
+    icc_profile = b'\x00' * 128
+    
+    jpeg_data = converter_module._insert_icc_profile(buffer.getvalue(), icc_profile)
+    jpeg_data = converter_module._insert_exif(jpeg_data, exif.tobytes())
+    
+    with Image.open(io.BytesIO(jpeg_data)) as converted:
+        assert converted.getexif()[0x0112] == 6
+        assert converted.getexif()[0x010f] == 'Apple'
+        assert converted.info['icc_profile'] == icc_profile
+        assert converted.size == (64, 48)
+
+
+def test_mozjpeg_only_with_optimize(monkeypatch):
+    """Test that mozjpeg's lossless optimizer is only used when optimize is set."""
+    calls = []
+    
+    def optimize(jpeg_data, copy=None):
+        calls.append(copy)
+        return jpeg_data
+    
+    fake_mozjpeg = types.SimpleNamespace(optimize=optimize, COPY_MARKERS=types.SimpleNamespace(ALL='all'))
+    monkeypatch.setattr(converter_module, 'mozjpeg_lossless_optimization', fake_mozjpeg)
+    monkeypatch.setattr(converter_module, 'simplejpeg', None)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = Path(temp_dir) / "photo.heic"
+        output_path = source_path.with_suffix('.jpg')
+        create_heic_file(source_path)
         
-        print("\n" + "=" * 40)
-        print("✓ All tests passed!")
-        print("\nThe converter is ready to use.")
-        print("To convert HEIC files, run:")
-        print("python main.py 'path/to/heic/folder'")
+        assert HEICToJPGConverter().convert_file(source_path, output_path)
+        assert calls == []
         
-    except Exception as e:
-        print(f"\n✗ Test failed: {e}")
-        return False
+        assert HEICToJPGConverter(optimize=True).convert_file(source_path, output_path)
+        assert calls == ['all']
+
+
+def test_orientation_applied_once():
+    """Test that EXIF orientation is applied to the pixels exactly once."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = Path(temp_dir) / "rotated.heic"
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90 CW
+        Image.new('RGB', (64, 48)).save(source_path, format='HEIF', exif=exif.tobytes())
+        
+        converter = HEICToJPGConverter()
+        assert converter.convert_single_file(source_path)
+        
+        with Image.open(source_path.with_suffix('.jpg')) as converted:
+            assert converted.size == (48, 64)
+            assert converted.getexif().get(0x0112, 1) == 1
+
+
+@pytest.mark.parametrize('options, expected_size', [
+    ({'passthrough_min_size': 200}, (240, 320)),  # 320px thumbnail
+    ({'passthrough_min_size': 400}, (480, 640)),  # no thumbnail large enough: full image
+    ({'max_dimension': 100}, (75, 100)),  # downscaled from the 320px thumbnail
+    ({'max_dimension': 400}, (300, 400)),  # no thumbnail twice as large: full image
+])
+def test_embedded_thumbnail(options, expected_size):
+    """Test that embedded thumbnails are only decoded when large enough, with orientation applied."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = Path(temp_dir) / "photo.heic"
+        image = Image.new('RGB', (640, 480), 'red')
+        image.paste('blue', (320, 0, 640, 480))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90 CW: red on top, blue at the bottom
+        image.save(source_path, format='HEIF', exif=exif.tobytes(), thumbnails=[128, 320])
+        
+        converter = HEICToJPGConverter(**options)
+        assert converter.convert_single_file(source_path)
+        
+        with Image.open(source_path.with_suffix('.jpg')) as converted:
+            assert converted.size == expected_size
+            assert converted.getexif().get(0x0112, 1) == 1
+            red, _, blue = converted.getpixel((converted.width // 2, 2))
+            assert red > 200 and blue < 50
+            red, _, blue = converted.getpixel((converted.width // 2, converted.height - 3))
+            assert red < 50 and blue > 200
+
+
+def test_grayscale_mode():
+    """Test that grayscale mode writes single-channel JPGs."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = Path(temp_dir) / "photo.heic"
+        create_heic_file(source_path)
+        
+        converter = HEICToJPGConverter(grayscale=True)
+        assert converter.convert_single_file(source_path)
+        
+        with Image.open(source_path.with_suffix('.jpg')) as converted:
+            assert converted.mode == 'L'
+            assert converted.size == (64, 48)
+
+
+def test_heic_decodes_straight_to_rgb(monkeypatch):
+    """Test that HEIC files decode directly into RGB with no extra conversion pass."""
+    conversions = []
+    original_convert = Image.Image.convert
+    
+    def tracking_convert(self, *args, **kwargs):
+        conversions.append(args)
+        return original_convert(self, *args, **kwargs)
+    
+    monkeypatch.setattr(Image.Image, 'convert', tracking_convert)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = Path(temp_dir) / "photo.heic"
+        create_heic_file(source_path)
+        
+        converter = HEICToJPGConverter()
+        assert converter.convert_single_file(source_path)
+    
+    assert conversions == []
+
+
+def test_simd_hint(caplog):
+    """Test that a Pillow-SIMD hint is logged in verbose mode when it is not installed."""
+    with caplog.at_level('DEBUG', logger=converter_module.logger.name):
+        converter = HEICToJPGConverter(verbose=True)
     
-    return True
+    assert converter.using_simd or 'pillow-simd' in caplog.text
 
 
-if __name__ == "__main__":
-    success = main()
-    exit(0 if success else 1)
\ No newline at end of file
+def test_deps_available():
+    """Test that importing the converter loaded its required dependencies."""
+    assert {'pillow_heif', 'PIL', 'piexif'} <= sys.modules.keys()